@@ -1,16 +1,52 @@
 #!/usr/bin/env python3
 """arXiv Morning Digest — reads full paper text via arXiv HTML, powered by Gemini."""
 
+import atexit
+import gzip
+import hashlib
+import io
 import json
+import math
 import os
 import re
+import shutil
+import string
+import threading
 import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
+from html import escape
 
 import requests
-from google import genai
-from google.genai import types
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # the Lexbor backend: selectolax 1.0 dropped the Modest one behind selectolax.parser
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser   # optional C parser for extract_text
+except ImportError:
+    HTMLParser = None
+
+try:
+    from lxml import etree as LET              # optional C parser for the arXiv feed
+except ImportError:
+    LET = None
+
+try:
+    import orjson                              # optional C JSON codec for API payloads and caches
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(data) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+try:
+    import ahocorasick                         # optional multi-keyword matcher for longevity_score
+except ImportError:
+    ahocorasick = None
 
 # ── Config ─────────────────────────────────────────────────────────────────────
 QUANT_CATEGORIES  = ["q-fin.CP", "q-fin.PM", "q-fin.ST", "q-fin.RM", "q-fin.TR"]
@@ -53,27 +89,71 @@ LONGEVITY_WEAK = [
     "DNA damage repair", "genomic instability",
 ]
 
+# Lowercased once here; longevity_score runs them against every bioRxiv/medRxiv item
+_STRONG_LC = tuple(kw.lower() for kw in LONGEVITY_STRONG)
+_WEAK_LC   = tuple(kw.lower() for kw in LONGEVITY_WEAK)
+
+
+def _keyword_automaton():
+    """Aho-Corasick automaton over both keyword lists, or None without pyahocorasick."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for kw in set(_STRONG_LC + _WEAK_LC):
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORDS = _keyword_automaton()
+
 
 def longevity_score(title: str, abstract: str) -> int:
     """Return relevance score for longevity filtering. 0 = not relevant."""
     title_l    = title.lower()
     abstract_l = abstract.lower()
+    if _KEYWORDS is not None:
+        # One pass per field finds every keyword at once; the sets count each keyword once
+        in_title    = {kw for _, kw in _KEYWORDS.iter(title_l)}
+        in_abstract = {kw for _, kw in _KEYWORDS.iter(abstract_l)}
+        return (sum(3 if kw in in_title else 1 if kw in in_abstract else 0 for kw in _STRONG_LC)
+                + sum(kw in in_title for kw in _WEAK_LC))
     score = 0
     # Strong keyword in title = very high signal
-    for kw in LONGEVITY_STRONG:
-        if kw.lower() in title_l:
+    for kw in _STRONG_LC:
+        if kw in title_l:
             score += 3
-        elif kw.lower() in abstract_l:
+        elif kw in abstract_l:
             score += 1
     # Weak keyword only if also supported by strong signal
-    for kw in LONGEVITY_WEAK:
-        if kw.lower() in title_l:
+    for kw in _WEAK_LC:
+        if kw in title_l:
             score += 1
     return score
 GEMINI_MODEL      = "gemini-2.5-flash-lite"
 OUTPUT_FILE       = "docs/index.html"
 FULL_TEXT_TIMEOUT = 10    # seconds per paper HTML fetch
 FULL_TEXT_CHARS   = 3000  # chars extracted per paper
+FULL_TEXT_BYTES   = 256 * 1024  # HTML bytes read per paper before the download is cut off
+ABSTRACT_CHARS    = 800   # abstract chars kept as fallback content when full text is unavailable
+ARXIV_DELAY       = 3     # seconds between arXiv API calls (arXiv's usage policy)
+FULL_TEXT_DELAY   = 0.3   # seconds between arXiv HTML page fetches
+FULL_TEXT_WORKERS = 8     # arXiv HTML pages downloaded concurrently
+FULL_TEXT_BURST   = 4     # HTML requests that may start back to back after an idle spell
+RXIV_WORKERS      = 4     # bioRxiv/medRxiv result pages fetched concurrently per server
+CACHE_DIR         = ".cache"
+GEMINI_CACHE_TTL  = 24 * 3600  # seconds a cached Gemini response stays valid
+LISTING_CACHE_TTL = 24 * 3600  # seconds cached arXiv/bioRxiv listing queries stay valid
+TEXT_CACHE_TTL    = 7 * 24 * 3600  # seconds an extracted arXiv full text is reused
+GEMINI_RETRIES    = 5       # attempts per Gemini request on 429/5xx, with exponential backoff
+GEMINI_BACKOFF    = 60      # cap in seconds on the wait between Gemini attempts
+GEMINI_TRANSIENT  = (429, 500, 502, 503, 504)  # API error codes worth retrying
+GEMINI_CHUNK      = 8       # papers per Gemini request; chunks of one analysis run concurrently
+GEMINI_WORKERS    = 4       # Gemini requests in flight per analysis
+COMBINE_GEMINI    = True    # quant + AI papers are chunked together (False: separately)
+ANALYZED_FILE     = os.path.join(CACHE_DIR, "analyzed.json")
+ANALYZED_TTL      = 7 * 24 * 3600  # seconds a paper's analysis is reused on later runs
+DEDUP_MIN_CHARS   = 200     # shorter content (empty abstracts, stubs) is never treated as identical
 
 TRADER_PROFILE = """
 Sa kirjutad EESTI KEELES hommikuse kokkuvõtte kvantitatiivse kaupleja jaoks.
@@ -111,7 +191,7 @@ SKOOR (1-10, summa):
   Uudsus             (0-2): kas on uus idee selle kaupleja jaoks?
 
 Tagasta AINULT kehtiv JSON — ilma markdown-ita, ilma lisatekstita.
-{"papers":[{"id":"...","title":"...","url":"...","category":"quant or ai","score":7,
+{"papers":[{"id":"...","title":"...","category":"quant or ai","score":7,
 "avastus":"...","selgitus":"...","toiming":"...","can_implement":true,"tags":["momentum"]}]}
 
 Sorteeri skoori järgi kahanevalt.
@@ -155,7 +235,7 @@ SKOOR (1-10):
   Uudsus               (0-2): uus tipu/protokoll/mehhanism?
 
 Tagasta AINULT kehtiv JSON, ilma markdown-ita.
-{"papers":[{"id":"...","title":"...","url":"...","category":"longevity","score":8,
+{"papers":[{"id":"...","title":"...","category":"longevity","score":8,
 "avastus":"...","selgitus":"...","toiming":"...","can_implement":true,"tags":["NAD+"]}]}
 
 Sorteeri skoori järgi kahanevalt.
@@ -163,79 +243,251 @@ ANALÜÜSI AINULT minu antud artikleid.
 """.strip()
 
 
+# ── Disk cache ─────────────────────────────────────────────────────────────────
+def _cache_load(path: str, ttl: float):
+    """Return JSON stored at path, or None if missing, unreadable or older than ttl seconds."""
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path, "rb") as fh:
+            return _json_loads(fh.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_save(path: str, data) -> None:
+    """Atomically write data as JSON to path, creating parent directories as needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_json_dumps(data))
+    os.replace(tmp, path)
+
+
+def _listing_path(key: str) -> str:
+    """Cache path for a listing query; the UTC date is part of the key so days never mix."""
+    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    digest = hashlib.sha256(f"{day}|{key}".encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, "listings", f"{digest}.json")
+
+
+def _cache_prune(directory: str, ttl: float) -> None:
+    """Delete cache files in directory older than ttl seconds."""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - ttl
+    for entry in os.scandir(directory):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+# ── HTTP ───────────────────────────────────────────────────────────────────────
+# One keep-alive session for every fetch, so repeated calls to a host reuse the TCP+TLS
+# connection; transient 429/5xx answers are retried with exponential backoff
+_SESSION = requests.Session()
+_SESSION.headers["User-Agent"] = "arxiv-digest-bot/1.0 (research tool)"
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=["GET"]),
+))
+atexit.register(_SESSION.close)
+
+
+class RateLimiter:
+    """Thread-safe token bucket: one request per interval, with up to burst banked while idle."""
+
+    def __init__(self, interval: float, burst: int = 1):
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self) -> None:
+        """Reserve the next free slot and sleep until it arrives.
+
+        The interval counts from when the previous request started, so time spent on
+        the request itself (or on other work in between) is not paid again as sleep.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now - (self.burst - 1) * self.interval)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 # ── arXiv fetch ────────────────────────────────────────────────────────────────
-def fetch_arxiv(categories: list, max_results: int = 80) -> list:
+# Fully qualified tag names, so lookups skip prefix→namespace resolution on every entry
+ATOM_ENTRY     = "{http://www.w3.org/2005/Atom}entry"
+ATOM_ID        = "{http://www.w3.org/2005/Atom}id"
+ATOM_TITLE     = "{http://www.w3.org/2005/Atom}title"
+ATOM_SUMMARY   = "{http://www.w3.org/2005/Atom}summary"
+ATOM_PUBLISHED = "{http://www.w3.org/2005/Atom}published"
+ARXIV_PRIMARY  = "{http://arxiv.org/schemas/atom}primary_category"
+
+_arxiv_api  = RateLimiter(ARXIV_DELAY)                        # export.arxiv.org query API
+_arxiv_html = RateLimiter(FULL_TEXT_DELAY, FULL_TEXT_BURST)   # arxiv.org/html full-text pages
+
+
+def _parse_published(published: str):
+    """Parse an Atom timestamp like 2024-01-31T18:00:00Z, or return None if malformed."""
+    try:
+        return datetime.fromisoformat(published.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def fetch_arxiv(categories: list, max_results: int = 80, abstract_limit: int = ABSTRACT_CHARS,
+                hours_back: int = HOURS_BACK) -> list:
     cat_query = "+OR+".join(f"cat:{c}" for c in categories)
+    # Let arXiv drop old submissions instead of downloading max_results and discarding most.
+    # Whole UTC days keep the URL (and so the listing cache) stable for the day; filter_recent
+    # still applies the exact cutoff.
+    now   = datetime.now(timezone.utc)
+    since = (now - timedelta(hours=hours_back)).strftime("%Y%m%d0000")
+    until = (now + timedelta(days=1)).strftime("%Y%m%d0000")
     url = (f"https://export.arxiv.org/api/query"
-           f"?search_query={cat_query}"
+           f"?search_query=%28{cat_query}%29+AND+submittedDate:[{since}+TO+{until}]"
            f"&sortBy=submittedDate&sortOrder=descending"
            f"&max_results={max_results}")
-    resp = requests.get(url, timeout=30)
-    resp.raise_for_status()
-    ns = {"a": "http://www.w3.org/2005/Atom"}
-    root = ET.fromstring(resp.content)
+    path = _listing_path(f"{url}|{abstract_limit}")
+    papers = _cache_load(path, LISTING_CACHE_TTL)
+    if papers is None:
+        papers = _parse_arxiv_feed(url, abstract_limit)
+        if papers:   # arXiv sporadically answers 200 with no entries; a re-run should ask again
+            _cache_save(path, papers)
+    for p in papers:      # datetimes are not JSON, so parse after the cache either way
+        p["pub_dt"] = _parse_published(p["published"])
+    return papers
+
+
+def _parse_arxiv_feed(url: str, abstract_limit: int) -> list:
+    """Download an arXiv API query and return its entries as JSON-safe paper dicts."""
+    _arxiv_api.wait()
     papers = []
-    for entry in root.findall("a:entry", ns):
-        raw_id = (entry.find("a:id", ns).text or "").strip()
-        papers.append({
-            "id":        raw_id.split("/abs/")[-1],
-            "url":       raw_id,
-            "title":     (entry.find("a:title", ns).text or "").strip().replace("\n", " "),
-            "abstract":  (entry.find("a:summary", ns).text or "").strip().replace("\n", " "),
-            "published": (entry.find("a:published", ns).text or ""),
-        })
+    # Stream the feed and parse entry by entry instead of buffering the body and building a full tree
+    with _SESSION.get(url, timeout=30, stream=True) as resp:
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        for entry in _iter_entries(resp.raw):
+            raw_id  = entry.findtext(ATOM_ID, "").strip()
+            primary = entry.find(ARXIV_PRIMARY)
+            papers.append({
+                "id":        raw_id.split("/abs/")[-1],
+                "url":       raw_id,
+                "title":     entry.findtext(ATOM_TITLE, "").strip().replace("\n", " "),
+                "abstract":  entry.findtext(ATOM_SUMMARY, "").strip().replace("\n", " ")[:abstract_limit],
+                "published": entry.findtext(ATOM_PUBLISHED, ""),
+                "primary":   primary.get("term", "") if primary is not None else "",
+            })
     return papers
 
 
+def _iter_entries(stream):
+    """Yield each Atom <entry> of a feed stream as it completes, then drop it from the tree."""
+    if LET is not None:
+        # lxml filters on the tag inside the C parser, so other elements never reach Python
+        for _, entry in LET.iterparse(stream, events=("end",), tag=ATOM_ENTRY):
+            yield entry
+            entry.clear()
+            # Clearing empties an entry but leaves its shell attached to <feed>; detach those too
+            while entry.getprevious() is not None:
+                del entry.getparent()[0]
+        return
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if root is None:
+            root = elem   # the first start event is <feed>
+        elif event == "end" and elem.tag == ATOM_ENTRY:
+            yield elem
+            root.clear()  # drops this and any earlier siblings, not just their contents
+
+
 def filter_recent(papers: list, hours: int) -> list:
     cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-    result = []
-    for p in papers:
-        try:
-            pub = datetime.fromisoformat(p["published"].replace("Z", "+00:00"))
-            if pub >= cutoff:
-                result.append(p)
-        except Exception:
-            pass
-    return result
+    return [p for p in papers if p["pub_dt"] is not None and p["pub_dt"] >= cutoff]
+
+
+def split_cross_listed(quant: list, ai: list) -> tuple:
+    """Keep papers returned by both queries in one list only, chosen by primary category.
+
+    Cross-listed papers (e.g. cs.LG primary, also q-fin.ST) would otherwise be analyzed
+    twice. They stay in AI only when their primary category is an AI one.
+    """
+    in_ai    = {p["id"] for p in ai}
+    in_quant = {p["id"] for p in quant}
+    both     = in_ai & in_quant
+    if not both:
+        return quant, ai
+    quant = [p for p in quant if p["id"] not in both or p["primary"] not in AI_CATEGORIES]
+    ai    = [p for p in ai    if p["id"] not in both or p["primary"] in AI_CATEGORIES]
+    return quant, ai
 
 
 # ── bioRxiv / medRxiv fetch ────────────────────────────────────────────────────
+def _rxiv_page(server: str, start_date: str, end_date: str, cursor: int):
+    """Fetch and score one 100-item page of the bioRxiv/medRxiv details API.
+
+    Returns {"total": result count, "papers": relevant papers}, or None on failure.
+    Successful pages are cached for LISTING_CACHE_TTL.
+    """
+    url  = f"https://api.biorxiv.org/details/{server}/{start_date}/{end_date}/{cursor}/json"
+    path = _listing_path(url)
+    page = _cache_load(path, LISTING_CACHE_TTL)
+    if page is not None:
+        return page
+    try:
+        resp = _SESSION.get(url, timeout=30)
+        resp.raise_for_status()
+        data = _json_loads(resp.content)
+    except Exception:
+        return None
+    page = {
+        "total":  int((data.get("messages") or [{}])[0].get("total", 0)),
+        "papers": _score_rxiv(server, data.get("collection", [])),
+    }
+    _cache_save(path, page)
+    return page
+
+
+def _score_rxiv(server: str, collection: list) -> list:
+    """Keep items above the longevity relevance threshold, in paper-dict form."""
+    scored = []
+    for item in collection:
+        title    = item.get("title", "").strip()
+        abstract = item.get("abstract", "").strip()
+        sc = longevity_score(title, abstract)
+        if sc >= 2:          # minimum relevance threshold
+            doi = item.get("doi", "")
+            scored.append({
+                "_score":    sc,
+                "id":        doi,
+                "url":       f"https://www.{server}.org/content/{doi}",
+                "title":     title,
+                "abstract":  abstract.replace("\n", " "),
+                "published": item.get("date", ""),
+                "content":   abstract[:2000],
+                "is_full":   False,
+                "source":    server,
+            })
+    return scored
+
+
 def _fetch_rxiv(server: str, start_date: str, end_date: str, scan_limit: int = 400) -> list:
     """Fetch and score papers from biorxiv or medrxiv by longevity relevance."""
-    scored, cursor = [], 0
-    while cursor < scan_limit:
-        url = f"https://api.biorxiv.org/details/{server}/{start_date}/{end_date}/{cursor}/json"
-        try:
-            resp = requests.get(url, timeout=30)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception:
-            break
-        collection = data.get("collection", [])
-        if not collection:
-            break
-        for item in collection:
-            title    = item.get("title", "").strip()
-            abstract = item.get("abstract", "").strip()
-            sc = longevity_score(title, abstract)
-            if sc >= 2:          # minimum relevance threshold
-                doi = item.get("doi", "")
-                scored.append({
-                    "_score":    sc,
-                    "id":        doi,
-                    "url":       f"https://www.{server}.org/content/{doi}",
-                    "title":     title,
-                    "abstract":  abstract.replace("\n", " "),
-                    "published": item.get("date", ""),
-                    "content":   abstract[:2000],
-                    "is_full":   False,
-                    "source":    server,
-                })
-        total = int((data.get("messages") or [{}])[0].get("total", 0))
-        cursor += 100
-        if cursor >= total:
-            break
+    first = _rxiv_page(server, start_date, end_date, 0)
+    if not first or not first["total"]:
+        return []
+    # The first page reports the total, so the remaining pages can be requested together
+    cursors = range(100, min(first["total"], scan_limit), 100)
+    with ThreadPoolExecutor(max_workers=RXIV_WORKERS) as ex:
+        rest = list(ex.map(lambda c: _rxiv_page(server, start_date, end_date, c), cursors))
+    scored = [p for page in [first] + rest if page for p in page["papers"]]
     # Sort by relevance score, return all (caller will merge + limit)
     scored.sort(key=lambda x: -x["_score"])
     return scored
@@ -246,23 +498,22 @@ def fetch_longevity_papers(days_back: int = 4, max_results: int = 12) -> list:
     end_date   = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     start_date = (datetime.now(timezone.utc) - timedelta(days=days_back)).strftime("%Y-%m-%d")
 
-    bio = _fetch_rxiv("biorxiv", start_date, end_date, scan_limit=500)
-    time.sleep(1)
-    med = _fetch_rxiv("medrxiv", start_date, end_date, scan_limit=500)
+    # Independent servers behind the same API — query both at once
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        bio_fut = ex.submit(_fetch_rxiv, "biorxiv", start_date, end_date, 500)
+        med_fut = ex.submit(_fetch_rxiv, "medrxiv", start_date, end_date, 500)
+        bio, med = bio_fut.result(), med_fut.result()
 
     # Merge, deduplicate, re-sort by score (medRxiv gets +1 bonus — human data)
-    seen, merged = set(), []
+    # Keyed on id: the first medRxiv copy wins, bioRxiv only fills ids not seen yet
+    by_id = {}
     for p in med:
-        if p["id"] not in seen:
-            seen.add(p["id"])
-            p["_score"] += 1   # human clinical data bonus
-            merged.append(p)
+        p["_score"] += 1   # human clinical data bonus
+        by_id.setdefault(p["id"], p)
     for p in bio:
-        if p["id"] not in seen:
-            seen.add(p["id"])
-            merged.append(p)
+        by_id.setdefault(p["id"], p)
 
-    merged.sort(key=lambda x: -x["_score"])
+    merged = sorted(by_id.values(), key=lambda x: -x["_score"])
     top = merged[:max_results]
     # Remove internal score key before returning
     for p in top:
@@ -271,33 +522,69 @@ def fetch_longevity_papers(days_back: int = 4, max_results: int = 12) -> list:
 
 
 # ── Full text extraction ───────────────────────────────────────────────────────
+# Elements dropped together with their content; the closing tags are matched case-insensitively
+_NOISE_TAGS = ("script", "style", "math", "figure")
+_NOISE_END  = {tag: re.compile(f"</{tag}>", re.IGNORECASE) for tag in _NOISE_TAGS}
+
+
+def _strip_tags(html: str) -> str:
+    """One left-to-right scan that keeps text runs and skips tags and noise elements."""
+    parts, i, n = [], 0, len(html)
+    while i < n:
+        lt = html.find("<", i)
+        if lt < 0:
+            parts.append(html[i:])
+            break
+        parts.append(html[i:lt])
+        head = html[lt + 1:lt + 7].lower()
+        for tag in _NOISE_TAGS:
+            if head.startswith(tag):
+                end = _NOISE_END[tag].search(html, lt)
+                break
+        else:
+            end = None
+        gt = html.find(">", lt + 1)
+        if end is not None and gt >= 0:
+            i = end.end()            # whole noise element, content included
+        elif gt > lt + 1:
+            parts.append(" ")        # ordinary tag: becomes a word break
+            i = gt + 1
+        else:
+            parts.append("<")        # a bare "<" is text
+            i = lt + 1
+    return "".join(parts)
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML page without script/style/math/figure, whitespace collapsed."""
+    if HTMLParser is not None:
+        # One linear parse in C; the noise elements are dropped from the tree with their content
+        tree = HTMLParser(html)
+        tree.strip_tags(["script", "style", "math", "figure"])
+        root = tree.body or tree.root
+        return " ".join(root.text(separator=" ").split()) if root is not None else ""
+    return " ".join(_strip_tags(html).split())
+
+
+# Conclusion/results markers; one case-insensitive scan finds the earliest of any of them
+_MARKERS_RE = re.compile(
+    r"conclusions?|in summary|we conclude|experimental results|our results|findings"
+    r"|we show that|we find that|we demonstrate|results show",
+    re.IGNORECASE,
+)
+
+
 def extract_text(html: str) -> str:
     """Strip HTML and extract intro + results/conclusion from arXiv paper."""
-    # Remove noise
-    html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<style[^>]*>.*?</style>',  '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<math[^>]*>.*?</math>',    '', html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r'<figure[^>]*>.*?</figure>', '', html, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'<[^>]+>', ' ', html)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = html_to_text(html)
 
     if len(text) < 300:
         return text
 
-    t_lower = text.lower()
-
     # Find the best conclusion/results section (must be in second half)
     midpoint = len(text) // 2
-    markers = [
-        'conclusion', 'conclusions', 'in summary', 'we conclude',
-        'experimental results', 'our results', 'findings', 'we show that',
-        'we find that', 'we demonstrate', 'results show',
-    ]
-    best_idx = -1
-    for m in markers:
-        idx = t_lower.find(m, midpoint)
-        if idx > 0 and (best_idx == -1 or idx < best_idx):
-            best_idx = idx
+    match    = _MARKERS_RE.search(text, midpoint)
+    best_idx = match.start() if match else -1
 
     intro       = text[:1800]
     conclusion  = text[best_idx: best_idx + 3000] if best_idx > 0 else text[-3000:]
@@ -305,60 +592,129 @@ def extract_text(html: str) -> str:
     return combined[:FULL_TEXT_CHARS]
 
 
+_NO_HTML_MARK = b"No HTML for"       # arXiv's page for papers without an HTML conversion
+_VERSION_RE   = re.compile(r'v\d+$')  # "2410.01234v2" -> "2410.01234"; the HTML URL takes the latest
+
+
 def fetch_full_text(paper: dict) -> tuple:
     """Try to get full paper text from arXiv HTML. Returns (content, is_full_text)."""
-    base_id = re.sub(r'v\d+$', '', paper['id'])
+    base_id = _VERSION_RE.sub('', paper['id'])
+    path = os.path.join(CACHE_DIR, "fulltext", base_id.replace("/", "_") + ".json")
+    cached = _cache_load(path, TEXT_CACHE_TTL)
+    if cached is not None:
+        return (cached["content"], True)
     url = f"https://arxiv.org/html/{base_id}"
+    _arxiv_html.wait()
     try:
-        resp = requests.get(url, timeout=FULL_TEXT_TIMEOUT,
-                            headers={"User-Agent": "arxiv-digest-bot/1.0 (research tool)"})
-        if resp.status_code == 200 and len(resp.text) > 3000:
-            extracted = extract_text(resp.text)
+        with _SESSION.get(url, timeout=FULL_TEXT_TIMEOUT, stream=True) as resp:
+            if resp.status_code != 200:
+                return (paper['abstract'], False)
+            # Pages with inline MathML run to megabytes; only the first FULL_TEXT_BYTES are read
+            chunks, size = [], 0
+            for chunk in resp.iter_content(chunk_size=65536):
+                if not chunks and _NO_HTML_MARK in chunk:
+                    return (paper['abstract'], False)   # "conversion unavailable" stub
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= FULL_TEXT_BYTES:
+                    break
+            # Decoded once, prefix only. arXiv's HTML is UTF-8; requests would report ISO-8859-1
+            # for a text/html response without an explicit charset, so only trust a declared one
+            declared = "charset" in resp.headers.get("Content-Type", "").lower()
+            html = b"".join(chunks).decode(resp.encoding if declared else "utf-8", errors="replace")
+        if len(html) > 3000:
+            extracted = extract_text(html)
             if len(extracted) > 400:
+                # Only successes are cached: a paper without HTML may get a conversion later
+                _cache_save(path, {"content": extracted})
                 return (extracted, True)
     except Exception:
         pass
-    return (paper['abstract'][:800], False)
+    return (paper['abstract'], False)   # already trimmed to ABSTRACT_CHARS by fetch_arxiv
 
 
 # ── Gemini ─────────────────────────────────────────────────────────────────────
-def build_prompt(papers: list, profile: str = None) -> str:
-    lines = [profile or TRADER_PROFILE, ""]
-    for p in papers:
-        source_label = "[FULL TEXT]" if p.get("is_full") else "[ABSTRACT ONLY]"
-        lines += [
-            "=" * 55,
-            f"{source_label} {p.get('category','').upper()} | ID: {p['id']}",
-            f"Title: {p['title']}",
-            f"URL: {p['url']}",
-            f"Content:\n{p['content']}",
-            "",
-        ]
-    return "\n".join(lines)
+_SEP           = "=" * 55
+_SOURCE_LABELS = ("\n[ABSTRACT ONLY] ", "\n[FULL TEXT] ")   # indexed by is_full
+
+
+def build_prompt(papers: list) -> str:
+    """Build the per-paper part of the prompt; the profile is sent separately by call_gemini."""
+    buf = io.StringIO()
+    w = buf.write
+    sent = set()
+    for i, p in enumerate(papers):
+        if i:
+            w("\n")   # blank line between papers
+        w(_SEP)
+        w(_SOURCE_LABELS[bool(p.get("is_full"))])
+        w(p.get("category", "").upper())
+        w(" | ID: ")
+        w(p["id"])
+        w("\nTitle: ")
+        w(p["title"])
+        w("\nContent:\n")
+        same_as = p.get("same_as")
+        if same_as in sent:   # identical text already in this prompt; split_duplicates sets same_as
+            w(f"[IDENTICAL TO {same_as}] Same content as paper {same_as} above; analyze this "
+              f"paper from that text under its own ID and title.")
+        else:
+            w(p["content"])
+        w("\n")
+        sent.add(p["id"])
+    return buf.getvalue()
+
+
+_JSON_DECODER = json.JSONDecoder()
+_PAPERS_RE    = re.compile(r'"papers"\s*:\s*\[')
+_ITEM_SEP_RE  = re.compile(r'[\s,]*')
+
+
+def _salvage_items(text: str) -> list:
+    """Decode the leading complete items of a possibly truncated "papers" (or first) array."""
+    match = _PAPERS_RE.search(text)
+    pos = match.end() if match else text.find("[") + 1
+    if pos <= 0:
+        return []
+    items = []
+    while True:
+        pos = _ITEM_SEP_RE.match(text, pos).end()
+        try:
+            item, pos = _JSON_DECODER.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return items
+        items.append(item)
 
 
 def extract_json(text: str) -> dict:
     """Robustly extract JSON from Gemini response, handling extra text."""
     text = text.strip()
-    # Strategy 1: direct parse
+    # Strategy 1: direct parse (orjson's decode error subclasses json's)
     try:
-        return json.loads(text)
+        return _json_loads(text)
     except json.JSONDecodeError:
         pass
-    # Strategy 2: find { and match closing brace by counting
-    start = text.find("{")
-    if start >= 0:
-        depth = 0
-        for i, ch in enumerate(text[start:], start):
-            if ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    try:
-                        return json.loads(text[start: i + 1])
-                    except json.JSONDecodeError:
-                        break
+    # Strategy 2: decode the first complete value at the first "{" and at the first "[" (a bare
+    # array of papers is valid too) and ignore the rest. Leading prose may hold a stray bracket
+    # ("see [1]"), so a candidate only wins if it normalizes to actual papers
+    decoded = None
+    for start in sorted({text.find("{"), text.find("[")} - {-1}):
+        try:
+            value = _JSON_DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            continue
+        if normalize_result(value)["papers"]:
+            return value
+        if decoded is None:
+            decoded = value
+    # Strategy 3: an answer cut off at max_output_tokens still holds the papers completed
+    # before the cut; decode the array items one by one and keep those
+    papers = _salvage_items(text)
+    if papers:
+        print(f"         (truncated JSON, recovered {len(papers)} complete papers)")
+        return {"papers": papers}
+    if decoded is not None:   # valid JSON without papers, e.g. an empty list
+        return decoded
     raise ValueError(f"No valid JSON found in response. First 300 chars: {text[:300]}")
 
 
@@ -381,168 +737,286 @@ def normalize_result(raw) -> dict:
         result = {"papers": []}
     # Filter out any non-dict items Gemini may have mixed in (e.g. "...remaining omitted")
     result["papers"] = [p for p in result.get("papers", []) if isinstance(p, dict)]
+    # Scores are sorted on and compared with ints downstream; anything but a finite number is 0
+    for p in result["papers"]:
+        score = p.get("score")
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score):
+            p["score"] = 0
     return result
 
 
-def call_gemini(prompt: str) -> dict:
-    api_key = os.environ.get("GEMINI_API_KEY", "")
-    if not api_key:
-        raise EnvironmentError("GEMINI_API_KEY is not set.")
-    client = genai.Client(api_key=api_key)
-    resp = client.models.generate_content(
+# google-genai pulls in pydantic, auth and HTTP client stacks; it is imported on the first real
+# request so empty days and fully cached runs never load it
+genai = errors = types = None
+_genai_lock = threading.Lock()
+
+
+def _load_genai() -> None:
+    global genai, errors, types
+    with _genai_lock:
+        if genai is None:
+            from google import genai
+            from google.genai import errors, types
+
+
+def _stream_gemini(client, prompt: str, profile: str) -> tuple:
+    """Run one streamed Gemini request and return (text, finish_reason)."""
+    stream = client.models.generate_content_stream(
         model=GEMINI_MODEL,
         contents=prompt,
         config=types.GenerateContentConfig(
+            system_instruction=profile,
             response_mime_type="application/json",
             temperature=0.1,
             max_output_tokens=16000,
         ),
     )
-    if not resp.text:
-        finish = (resp.candidates[0].finish_reason if resp.candidates else "unknown")
+    # Collect chunks as they arrive; the JSON is only complete once the stream ends
+    parts, finish = [], "unknown"
+    for chunk in stream:
+        if chunk.text:
+            parts.append(chunk.text)
+        if chunk.candidates and chunk.candidates[0].finish_reason:
+            finish = chunk.candidates[0].finish_reason
+    return "".join(parts), finish
+
+
+def call_gemini(prompt: str, profile: str = TRADER_PROFILE) -> dict:
+    # temperature=0.1 is near-deterministic, so an identical prompt can reuse the stored answer
+    key  = hashlib.sha256(f"{GEMINI_MODEL}|{profile}|{prompt}".encode("utf-8")).hexdigest()
+    path = os.path.join(CACHE_DIR, "gemini", f"{key}.json")
+    cached = _cache_load(path, GEMINI_CACHE_TTL)
+    if cached is not None:
+        print("         (Gemini cache hit)")
+        return cached
+
+    api_key = os.environ.get("GEMINI_API_KEY", "")
+    if not api_key:
+        raise EnvironmentError("GEMINI_API_KEY is not set.")
+    _load_genai()
+    client = genai.Client(api_key=api_key)
+    for attempt in range(1, GEMINI_RETRIES + 1):
+        try:
+            text, finish = _stream_gemini(client, prompt, profile)
+            break
+        except errors.APIError as e:
+            # Rate limits, overload, gateway errors and deadlines are transient; others are not
+            if e.code not in GEMINI_TRANSIENT or attempt == GEMINI_RETRIES:
+                raise
+            delay = min(2 ** attempt, GEMINI_BACKOFF)
+            print(f"         Gemini error {e.code}, retry {attempt}/{GEMINI_RETRIES - 1} in {delay}s")
+            time.sleep(delay)
+    print(f"         <- {len(text)} chars streamed, finish_reason={finish}")
+    if not text:
         raise ValueError(f"Gemini returned empty response. finish_reason={finish}")
-    return normalize_result(extract_json(resp.text))
+    result = normalize_result(extract_json(text))
+    _cache_save(path, result)
+    return result
 
 
 # ── HTML rendering ─────────────────────────────────────────────────────────────
-def score_style(score: int) -> tuple:
-    if score >= 8: return ("#e8f5e9", "#2e7d32")
-    if score >= 6: return ("#fff8e1", "#e65100")
-    if score >= 4: return ("#f5f5f5", "#757575")
-    return ("#fafafa", "#bdbdbd")
+# Score band CSS class per integer score 0-10 (colours live in digest_template.html)
+SCORE_CLASSES = tuple(
+    "s-hi" if s >= 8 else
+    "s-mid" if s >= 6 else
+    "s-low" if s >= 4 else
+    "s-min"
+    for s in range(11)
+)
 
 
-def render_card(p: dict) -> str:
-    score = p.get("score", 0)
-    bg, fg = score_style(score)
-    cat = p.get("category", "")
-    cat_label = "QUANT" if cat == "quant" else "AI"
-    cat_color = "#1565c0" if cat == "quant" else "#6a1b9a"
-    can = p.get("can_implement", False)
-    impl_color = "#2e7d32" if can else "#9e9e9e"
-    impl_text  = "Implementeeritav RealTest-is" if can else "Ei ole otseselt implementeeritav"
-    tags = " ".join(
-        f'<span style="background:#f0f0f0;color:#777;padding:1px 7px;border-radius:3px;font-size:11px;">{t}</span>'
-        for t in p.get("tags", [])
-    )
-    return f"""<div style="background:#fff;border:1px solid #e8e8e8;border-left:3px solid {fg};border-radius:6px;padding:20px 22px;margin-bottom:12px;">
-  <div style="display:flex;align-items:center;gap:8px;margin-bottom:14px;flex-wrap:wrap;">
-    <span style="background:{bg};color:{fg};font-weight:700;padding:2px 10px;border-radius:4px;font-size:13px;">{score}/10</span>
-    <span style="color:{cat_color};font-size:11px;font-weight:700;letter-spacing:1px;border:1px solid {cat_color};padding:1px 7px;border-radius:3px;">{cat_label}</span>
-    <a href="{p.get('url','#')}" target="_blank" rel="noopener"
-       style="color:#111;font-weight:600;font-size:15px;text-decoration:none;line-height:1.4;">{p.get('title','')}</a>
+def score_class(score: int) -> str:
+    return SCORE_CLASSES[min(max(int(score), 0), 10)]
+
+
+TAG_TEMPLATE = '<span class="tag">{}</span>'
+
+CARD_TEMPLATE = """<div class="card {band}">
+  <div class="head">
+    <span class="score">{score}/10</span>
+    <span class="cat {cat_class}">{cat_label}</span>
+    <a href="{url}" target="_blank" rel="noopener">{title}</a>
   </div>
-  <div style="border-top:1px solid #f2f2f2;padding-top:12px;">
-    <div style="display:grid;grid-template-columns:100px 1fr;gap:0;margin-bottom:2px;">
-      <span style="font-size:10px;font-weight:700;text-transform:uppercase;letter-spacing:1px;color:#bbb;padding:10px 0;">Avastus</span>
-      <span style="font-size:14px;color:#111;line-height:1.7;padding:10px 0;border-bottom:1px solid #f5f5f5;">{p.get('avastus','')}</span>
-    </div>
-    <div style="display:grid;grid-template-columns:100px 1fr;gap:0;margin-bottom:2px;">
-      <span style="font-size:10px;font-weight:700;text-transform:uppercase;letter-spacing:1px;color:#bbb;padding:10px 0;">Tähendus</span>
-      <span style="font-size:13px;color:#444;line-height:1.65;padding:10px 0;border-bottom:1px solid #f5f5f5;">{p.get('selgitus','')}</span>
-    </div>
-    <div style="display:grid;grid-template-columns:100px 1fr;gap:0;">
-      <span style="font-size:10px;font-weight:700;text-transform:uppercase;letter-spacing:1px;color:#bbb;padding:10px 0;">Toiming</span>
-      <span style="font-size:13px;color:#1b5e20;line-height:1.7;padding:10px 0;font-weight:500;">{p.get('toiming','')}</span>
-    </div>
+  <div class="body">
+    <div class="field"><span class="label">Avastus</span><span class="avastus">{avastus}</span></div>
+    <div class="field"><span class="label">Tähendus</span><span class="selgitus">{selgitus}</span></div>
+    <div class="field"><span class="label">Toiming</span><span class="toiming">{toiming}</span></div>
   </div>
-  <div style="margin-top:10px;display:flex;align-items:center;gap:8px;flex-wrap:wrap;">
-    <span style="font-size:11px;color:{impl_color};">● {impl_text}</span>
-    <span style="color:#e0e0e0;">|</span>
+  <div class="foot">
+    <span class="{impl_class}">● {impl_text}</span>
+    <span class="sep">|</span>
     {tags}
   </div>
 </div>"""
 
-
-def render_row(p: dict) -> str:
-    score = p.get("score", 0)
-    bg, fg = score_style(score)
-    title = p.get("title", "")[:105]
-    toiming = p.get("toiming", "")[:150]
-    return f"""<div style="display:flex;gap:12px;padding:10px 4px;border-bottom:1px solid #f5f5f5;align-items:flex-start;">
-  <span style="background:{bg};color:{fg};font-weight:700;padding:1px 8px;border-radius:3px;font-size:11px;white-space:nowrap;flex-shrink:0;">{score}/10</span>
+ROW_TEMPLATE = """<div class="row {band}">
+  <span class="score">{score}/10</span>
   <div>
-    <a href="{p.get('url','#')}" target="_blank" rel="noopener"
-       style="color:#444;font-size:13px;text-decoration:none;font-weight:500;">{title}{'…' if len(p.get('title',''))>105 else ''}</a>
-    <div style="font-size:11px;color:#999;margin-top:3px;">{toiming}{'…' if len(p.get('toiming',''))>150 else ''}</div>
+    <a href="{url}" target="_blank" rel="noopener">{title}</a>
+    <div class="action">{toiming}</div>
   </div>
 </div>"""
 
+LINK_TEMPLATE = """<div class="link"><a href="{url}" target="_blank" rel="noopener">{title}</a></div>"""
+
+
+# Everything interpolated below comes from paper metadata or Gemini output, so it is escaped:
+# a "<" in a title must not break the page, and model output must not inject markup
+def _field(p: dict, key: str, default: str = "") -> str:
+    """p[key] as text; Gemini may send null or a non-string for any field."""
+    value = p.get(key)
+    return default if value is None or value == "" else str(value)
+
+
+def render_card(p: dict) -> str:
+    score = p.get("score", 0)
+    quant = p.get("category", "") == "quant"
+    can = p.get("can_implement", False)
+    return CARD_TEMPLATE.format_map({
+        "band": score_class(score), "score": escape(str(score)),
+        "cat_label":  "QUANT" if quant else "AI",
+        "cat_class":  "cat-quant" if quant else "cat-ai",
+        "url":        escape(_field(p, "url", "#")),
+        "title":      escape(_field(p, "title")),
+        "avastus":    escape(_field(p, "avastus")),
+        "selgitus":   escape(_field(p, "selgitus")),
+        "toiming":    escape(_field(p, "toiming")),
+        "impl_class": "impl-yes" if can else "impl-no",
+        "impl_text":  "Implementeeritav RealTest-is" if can else "Ei ole otseselt implementeeritav",
+        "tags":       " ".join(TAG_TEMPLATE.format(escape(str(t))) for t in p.get("tags") or []),
+    })
+
+
+def render_row(p: dict) -> str:
+    score = p.get("score", 0)
+    title = _field(p, "title")
+    toiming = _field(p, "toiming")
+    return ROW_TEMPLATE.format_map({
+        "band": score_class(score), "score": escape(str(score)),
+        "url":     escape(_field(p, "url", "#")),
+        "title":   escape(title[:105] + ("…" if len(title) > 105 else "")),
+        "toiming": escape(toiming[:150] + ("…" if len(toiming) > 150 else "")),
+    })
+
 
 def render_ai_link(p: dict) -> str:
-    return (f'<div style="padding:7px 0;border-bottom:1px solid #f5f5f5;">'
-            f'<a href="{p.get("url","#")}" target="_blank" rel="noopener" '
-            f'style="color:#444;font-size:13px;text-decoration:none;">{p.get("title","")}</a>'
-            f'</div>')
-
-
-def generate_html(quant_result: dict, ai_result: dict, bio_result: dict,
-                  quant_count: int, ai_count: int, bio_count: int,
-                  full_text_count: int, total_papers: int) -> str:
-    all_papers = (quant_result.get("papers", []) +
-                  ai_result.get("papers", []) +
-                  bio_result.get("papers", []))
-    top   = [p for p in all_papers if p.get("score", 0) >= 7]
-    quant = [p for p in quant_result.get("papers", []) if p.get("score", 0) < 7]
-    ai    = [p for p in ai_result.get("papers", []) if p.get("score", 0) < 7]
-    bio   = [p for p in bio_result.get("papers", []) if p.get("score", 0) < 7]
-
-    def section(items):
-        if not items:
-            return '<p style="color:#ccc;font-size:13px;padding:12px 0;">Täna artikleid pole.</p>'
-        return "\n".join(render_card(p) if p.get("score", 0) >= 5 else render_row(p) for p in items)
-
-    date_str = datetime.now(timezone.utc).strftime("%B %d, %Y")
-    weekday  = datetime.now(timezone.utc).strftime("%A")
-    time_str = datetime.now(timezone.utc).strftime("%H:%M UTC")
-
-    bio_section = f"""
-<h2>Longevity &amp; Tervis — bioRxiv</h2>
-{section(bio)}
-""" if bio_count > 0 else ""
-
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width,initial-scale=1">
-<title>Morning Digest · {date_str}</title>
-<style>
-  *{{margin:0;padding:0;box-sizing:border-box}}
-  body{{background:#f6f6f4;color:#111;font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Helvetica,Arial,sans-serif;padding:40px 24px;max-width:760px;margin:0 auto;line-height:1.5}}
-  h2{{font-size:10px;font-weight:700;text-transform:uppercase;letter-spacing:2.5px;color:#aaa;margin:44px 0 16px;padding-bottom:10px;border-bottom:1px solid #e4e4e4}}
-  @media(max-width:600px){{body{{padding:20px 14px}}}}
-</style>
-</head>
-<body>
-
-<div style="border-bottom:2px solid #111;padding-bottom:20px;margin-bottom:4px;">
-  <div style="font-size:10px;color:#aaa;text-transform:uppercase;letter-spacing:2px;margin-bottom:6px;">{weekday} · arXiv Morning Digest</div>
-  <div style="font-size:28px;font-weight:700;letter-spacing:-0.5px;margin-bottom:14px;">{date_str}</div>
-  <div style="display:flex;gap:16px;flex-wrap:wrap;font-size:13px;color:#666;">
-    <span>📊 {quant_count} quant</span>
-    <span>🤖 {ai_count} AI</span>
-    <span>🧬 {bio_count} longevity</span>
-    <span>📄 {full_text_count}/{total_papers} full text</span>
-    <span>⭐ {len(top)} top picks</span>
-    <span style="color:#bbb;">Generated {time_str}</span>
-  </div>
-</div>
+    return LINK_TEMPLATE.format_map({
+        "url":   escape(_field(p, "url", "#")),
+        "title": escape(_field(p, "title")),
+    })
+
 
-<h2>Top Picks — Worth your time</h2>
-{section(top) if top else '<p style="color:#ccc;font-size:13px;padding:12px 0;">Täna kõrgeid skoore pole.</p>'}
+# Page skeleton lives in digest_template.html; $sections marks where the cards go
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "digest_template.html"),
+          encoding="utf-8") as _fh:
+    PAGE_HEAD, PAGE_TAIL = (string.Template(part) for part in _fh.read().split("$sections"))
 
-<h2>Kvantitatiivne rahandus — Remaining</h2>
-{section(quant)}
+EMPTY_SECTION = '<p class="empty">Täna artikleid pole.</p>'
+EMPTY_TOP     = '<p class="empty">Täna kõrgeid skoore pole.</p>'
 
-<h2>AI &amp; Automatiseerimine — Remaining</h2>
-{section(ai)}
-{bio_section}
-<div style="margin-top:56px;padding-top:16px;border-top:1px solid #e8e8e8;font-size:10px;color:#ccc;text-align:center;">
-  Auto-generated · Gemini {GEMINI_MODEL} · arXiv API · Last {HOURS_BACK}h
-</div>
-</body>
-</html>"""
+
+def write_section(fh, items: list, empty: str = EMPTY_SECTION) -> None:
+    """Write one section's cards/rows straight to fh."""
+    if not items:
+        fh.write(empty)
+        return
+    # writelines drains the generator in C: one call per section instead of two per paper
+    fh.writelines((render_card(p) if p["score"] >= 5 else render_row(p)) + "\n" for p in items)
+
+
+def write_html(fh, quant_result: dict, ai_result: dict, bio_result: dict,
+               quant_count: int, ai_count: int, bio_count: int,
+               full_text_count: int, total_papers: int) -> None:
+    """Stream the digest page into the open text file fh, section by section."""
+    # One pass: each paper goes to Top Picks or to its own section's remaining list
+    top, quant, ai, bio = [], [], [], []
+    for result, rest in ((quant_result, quant), (ai_result, ai), (bio_result, bio)):
+        for p in result.get("papers", []):
+            (top if p.setdefault("score", 0) >= 7 else rest).append(p)
+
+    now      = datetime.now(timezone.utc)
+    date_str = now.strftime("%B %d, %Y")
+    weekday  = now.strftime("%A")
+    time_str = now.strftime("%H:%M UTC")
+
+    fields = dict(
+        date_str=date_str, weekday=weekday, time_str=time_str,
+        quant_count=quant_count, ai_count=ai_count, bio_count=bio_count,
+        full_text_count=full_text_count, total_papers=total_papers, top_count=len(top),
+        model=GEMINI_MODEL, hours_back=HOURS_BACK,
+    )
+    fh.write(PAGE_HEAD.substitute(fields))
+    write_section(fh, top, empty=EMPTY_TOP)
+    fh.write("\n\n<h2>Kvantitatiivne rahandus — Remaining</h2>\n")
+    write_section(fh, quant)
+    fh.write("\n\n<h2>AI &amp; Automatiseerimine — Remaining</h2>\n")
+    write_section(fh, ai)
+    fh.write("\n")
+    if bio_count > 0:
+        fh.write("\n<h2>Longevity &amp; Tervis — bioRxiv</h2>\n")
+        write_section(fh, bio)
+        fh.write("\n")
+    fh.write(PAGE_TAIL.substitute(fields))
+
+
+def save_page(*args) -> None:
+    """Write OUTPUT_FILE via write_html, plus a pre-compressed .gz copy beside it.
+
+    Both are written to temporary files and moved into place, so an interrupted run never
+    leaves a truncated page behind for the publish step.
+    """
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    tmp_html, tmp_gz = f"{OUTPUT_FILE}.tmp", f"{OUTPUT_FILE}.gz.tmp"
+    try:
+        with open(tmp_html, "w", encoding="utf-8", buffering=1 << 16) as fh:
+            write_html(fh, *args)
+        # mtime=0 keeps the archive byte-identical when the page itself has not changed; passing
+        # fileobj lets the header's FNAME name the page rather than the temporary file
+        with open(tmp_html, "rb") as src, open(tmp_gz, "wb") as raw, \
+                gzip.GzipFile(os.path.basename(OUTPUT_FILE), "wb", compresslevel=6,
+                              fileobj=raw, mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+    except BaseException:
+        for tmp in (tmp_html, tmp_gz):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        raise
+    os.replace(tmp_html, OUTPUT_FILE)
+    os.replace(tmp_gz, OUTPUT_FILE + ".gz")
+
+
+# ── Incremental analysis ───────────────────────────────────────────────────────
+def load_analyzed() -> dict:
+    """Load {paper_id: {"ts", "is_full", "paper"}} from earlier runs, dropping expired entries."""
+    data = _cache_load(ANALYZED_FILE, float("inf")) or {}
+    cutoff = time.time() - ANALYZED_TTL
+    return {pid: rec for pid, rec in data.items() if rec.get("ts", 0) >= cutoff}
+
+
+def split_analyzed(papers: list, analyzed: dict) -> tuple:
+    """Split papers into (fresh papers to analyze, stored records for already-analyzed ones)."""
+    fresh, reused = [], []
+    for p in papers:
+        rec = analyzed.get(p["id"])
+        if rec is not None:
+            reused.append(rec)
+        else:
+            fresh.append(p)
+    return fresh, reused
+
+
+def merge_analyzed(result: dict, fresh: list, reused: list, analyzed: dict) -> dict:
+    """Record new analyses in analyzed and add the reused ones back into result, sorted by score."""
+    by_id = {p["id"]: p for p in fresh}
+    now = time.time()
+    for rec in result.get("papers", []):
+        src = by_id.get(rec.get("id"))
+        if src is not None:     # only cache analyses of papers we actually sent
+            rec["url"] = src["url"]   # URLs are not in the prompt; restore them from the source
+            analyzed[src["id"]] = {"ts": now, "is_full": src.get("is_full", False), "paper": rec}
+    result["papers"] = result.get("papers", []) + [r["paper"] for r in reused]
+    result["papers"].sort(key=lambda x: -x.get("score", 0))
+    return result
 
 
 # ── Main ───────────────────────────────────────────────────────────────────────
@@ -550,81 +1024,197 @@ def ts() -> str:
     return datetime.now().strftime("%H:%M:%S")
 
 
-def fetch_and_analyze(papers_raw: list, category: str, label: str) -> tuple:
-    """Fetch full text for papers and run Gemini analysis. Returns (result_dict, full_count)."""
-    papers = [dict(p, category=category) for p in papers_raw]
-    full_count = 0
-    print(f"[{ts()}] Fetching full text for {len(papers)} {label} papers...")
-    for i, p in enumerate(papers):
-        content, is_full = fetch_full_text(p)
-        p["content"] = content
-        p["is_full"] = is_full
-        if is_full:
-            full_count += 1
-        status = "full" if is_full else "abstract"
-        print(f"         [{i+1:2d}/{len(papers)}] {status} — {p['title'][:55]}...")
-        time.sleep(0.3)
-    print(f"[{ts()}] Full text: {full_count}/{len(papers)}")
-    if not papers:
-        return {"papers": []}, 0
-    print(f"[{ts()}] Sending to Gemini — {len(papers)} {label} papers...")
-    result = call_gemini(build_prompt(papers))
-    print(f"         -> {len(result.get('papers', []))} analyzed")
-    time.sleep(10)  # polite pause between Gemini calls
-    return result, full_count
+def prepare_papers(papers_raw: list, category: str, label: str, analyzed: dict) -> tuple:
+    """Split off already-analyzed papers and fetch full text for the rest.
+
+    Abstract-only analyses are reused too, but their papers are still checked for an HTML
+    conversion; one that has appeared since sends the paper back for a full-text analysis.
+    Returns (fresh papers with content, reused analysis records, full-text count).
+    """
+    tagged = [dict(p, category=category) for p in papers_raw]
+    papers, reused = split_analyzed(tagged, analyzed)
+    recheck = [p for p in tagged if p["id"] in analyzed and not analyzed[p["id"]].get("is_full")]
+    if reused:
+        print(f"[{ts()}] Reusing {len(reused)} {label} papers analyzed on earlier runs")
+    extra = f" (+{len(recheck)} abstract-only re-checked)" if recheck else ""
+    print(f"[{ts()}] Fetching full text for {len(papers)} {label} papers{extra}...")
+    # Downloads overlap in a pool; _arxiv_html still paces request starts for politeness.
+    # Results are reported as they finish rather than after the slowest page.
+    total = len(papers) + len(recheck)
+    with ThreadPoolExecutor(max_workers=FULL_TEXT_WORKERS) as ex:
+        futures = {ex.submit(fetch_full_text, p): p for p in papers + recheck}
+        for done, fut in enumerate(as_completed(futures), 1):
+            p = futures[fut]
+            p["content"], p["is_full"] = fut.result()
+            status = "full" if p["is_full"] else "abstract"
+            print(f"         [{done:2d}/{total}] {status} — {p['title'][:55]}...")
+    upgraded = {p["id"] for p in recheck if p["is_full"]}
+    if upgraded:
+        print(f"         ({len(upgraded)} {label} papers now have full text, analyzing again)")
+        papers, reused = split_analyzed(tagged, {pid: rec for pid, rec in analyzed.items()
+                                                 if pid not in upgraded})
+    full_count = (sum(1 for p in papers if p["is_full"])
+                  + sum(1 for r in reused if r.get("is_full")))
+    print(f"[{ts()}] Full text ({label}): {full_count}/{len(papers) + len(reused)}")
+    return papers, reused, full_count
+
+
+def _analyze_chunk(papers: list, profile: str, label: str):
+    """Analyze one chunk. Returns its records, or None if the chunk failed.
+
+    A transient failure (retries exhausted, unusable JSON) costs only this chunk's papers.
+    A missing key (only hit when the response cache misses) or a non-transient API error such
+    as a bad key is raised: every other chunk would hit it too.
+    """
+    try:
+        return call_gemini(build_prompt(papers), profile=profile)["papers"]
+    except Exception as e:
+        if not os.environ.get("GEMINI_API_KEY") or (
+                errors is not None and isinstance(e, errors.APIError)
+                and e.code not in GEMINI_TRANSIENT):
+            raise
+        print(f"         ! {label} chunk of {len(papers)} papers failed, retried next run: {e}")
+        return None
+
+
+def split_duplicates(papers: list) -> tuple:
+    """Split papers into (papers to send, [(duplicate, id of its first)]).
+
+    Only another version of the same paper with identical content is collapsed into its first.
+    Other identical content is more likely a shared error or template page than a duplicate, so
+    that paper is still sent, marked same_as the first for build_prompt to reference.
+    """
+    first_by_hash, send, duplicates = {}, [], []
+    for p in papers:
+        if len(p["content"]) < DEDUP_MIN_CHARS:
+            send.append(p)
+            continue
+        digest = hashlib.blake2b(p["content"].encode("utf-8"), digest_size=16).digest()
+        first = first_by_hash.setdefault(digest, p)
+        if first is p:
+            send.append(p)
+        elif _VERSION_RE.sub("", p["id"]) == _VERSION_RE.sub("", first["id"]):
+            duplicates.append((p, first["id"]))
+        else:
+            send.append(dict(p, same_as=first["id"]))
+    return send, duplicates
 
 
-def analyze_longevity(papers: list) -> dict:
-    """Run Gemini analysis on bioRxiv longevity papers using LONGEVITY_PROFILE."""
+def analyze(papers: list, profile: str, label: str) -> dict:
+    """Run Gemini analysis over papers in GEMINI_CHUNK-sized requests; an empty list skips it.
+
+    The chunks go out concurrently. Each prompt carries only its papers, so the response
+    cache still hits for chunks whose papers are unchanged when the rest of the set moves.
+    Another version of an already listed paper with identical content is not sent; it gets a
+    copy of that version's analysis.
+    """
     if not papers:
         return {"papers": []}
-    print(f"[{ts()}] Sending to Gemini — {len(papers)} longevity papers...")
-    result = call_gemini(build_prompt(papers, profile=LONGEVITY_PROFILE))
-    print(f"         -> {len(result.get('papers', []))} analyzed")
-    time.sleep(10)
+    papers, duplicates = split_duplicates(papers)
+    chunks = [papers[i:i + GEMINI_CHUNK] for i in range(0, len(papers), GEMINI_CHUNK)]
+    print(f"[{ts()}] Sending to Gemini — {len(papers)} {label} papers, {len(chunks)} request(s)...")
+    with ThreadPoolExecutor(max_workers=GEMINI_WORKERS) as ex:
+        futures = [ex.submit(_analyze_chunk, chunk, profile, label) for chunk in chunks]
+        chunk_records = [fut.result() for fut in futures]
+    # Losing every chunk means Gemini is unusable (quota spent, outage); stop before the
+    # page is rewritten so yesterday's digest stays published
+    if all(recs is None for recs in chunk_records):
+        raise RuntimeError(f"All {len(chunks)} Gemini requests for {label} papers failed")
+    result = {"papers": [rec for recs in chunk_records if recs for rec in recs]}
+    # Links, categories and the analyzed cache all key on the id sent; map back an id Gemini
+    # echoed without (or with another) version suffix
+    sent_ids = {p["id"] for p in papers}
+    by_base  = {_VERSION_RE.sub("", pid): pid for pid in sent_ids}
+    for rec in result["papers"]:
+        rid = rec.get("id")
+        if rid not in sent_ids:
+            rec["id"] = by_base.get(_VERSION_RE.sub("", str(rid)), rid)
+    if duplicates:
+        by_id, copied = {rec.get("id"): rec for rec in result["papers"]}, 0
+        for p, first_id in duplicates:
+            if first_id in by_id:
+                result["papers"].append(dict(by_id[first_id], id=p["id"], title=p["title"]))
+                copied += 1
+        if copied:
+            print(f"         ({copied} {label} papers were identical versions, analysis copied)")
+    print(f"         -> {len(result['papers'])} {label} analyzed")
     return result
 
 
-def main() -> None:
-    # 1. Fetch abstracts
-    print(f"[{ts()}] Fetching quant papers...")
-    quant_new = filter_recent(fetch_arxiv(QUANT_CATEGORIES, max_results=80), HOURS_BACK)[:MAX_QUANT]
-    print(f"         -> {len(quant_new)} papers")
-    time.sleep(2)
+def longevity_pipeline(analyzed: dict) -> tuple:
+    """Fetch and analyze longevity papers. Returns (papers found, fresh, reused, result)."""
+    longevity_new = fetch_longevity_papers(4, MAX_LONGEVITY)
+    print(f"         -> {len(longevity_new)} longevity")
+    fresh, reused = split_analyzed(longevity_new, analyzed)
+    return longevity_new, fresh, reused, analyze(fresh, LONGEVITY_PROFILE, "longevity")
 
-    print(f"[{ts()}] Fetching AI papers...")
-    ai_new = filter_recent(fetch_arxiv(AI_CATEGORIES, max_results=60), HOURS_BACK)[:MAX_AI]
-    print(f"         -> {len(ai_new)} papers")
-    time.sleep(2)
 
-    print(f"[{ts()}] Fetching longevity papers from bioRxiv + medRxiv...")
-    longevity_new = fetch_longevity_papers(days_back=4, max_results=MAX_LONGEVITY)
-    print(f"         -> {len(longevity_new)} papers")
+def analyze_trader_papers(quant: list, ai: list) -> tuple:
+    """Analyze quant and AI papers with TRADER_PROFILE. Returns (quant_result, ai_result).
+
+    Both groups share one profile, so with COMBINE_GEMINI they are chunked as one list
+    (no half-empty chunk per group) and the answers are split back by paper id.
+    """
+    batches = [(quant + ai, "quant + AI")] if COMBINE_GEMINI else [(quant, "quant"), (ai, "AI")]
+    quant_ids, ai_ids = {p["id"] for p in quant}, {p["id"] for p in ai}
+    quant_result, ai_result = {"papers": []}, {"papers": []}
+    for papers, label in batches:
+        for rec in analyze(papers, TRADER_PROFILE, label)["papers"]:
+            rid = rec.get("id")
+            if rid in quant_ids or rid in ai_ids:
+                rec["category"] = "quant" if rid in quant_ids else "ai"
+            (quant_result if rec.get("category") == "quant" else ai_result)["papers"].append(rec)
+    return quant_result, ai_result
+
+
+def main() -> None:
+    _cache_prune(os.path.join(CACHE_DIR, "gemini"), GEMINI_CACHE_TTL)
+    _cache_prune(os.path.join(CACHE_DIR, "listings"), LISTING_CACHE_TTL)
+    _cache_prune(os.path.join(CACHE_DIR, "fulltext"), TEXT_CACHE_TTL)
+
+    # Longevity runs fetch -> Gemini on its own thread from the start; it shares nothing with the
+    # arXiv side, so its bioRxiv paging and Gemini call overlap the arXiv fetches below
+    analyzed = load_analyzed()
+    print(f"[{ts()}] Fetching quant + AI papers (arXiv) and longevity papers (bioRxiv + medRxiv)...")
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        longevity_fut = ex.submit(longevity_pipeline, analyzed)
+
+        # 1. Fetch abstracts — arXiv calls stay spaced by _arxiv_api
+        quant_fut = ex.submit(fetch_arxiv, QUANT_CATEGORIES, 80)
+        ai_fut    = ex.submit(fetch_arxiv, AI_CATEGORIES, 60)
+        quant_new, ai_new = split_cross_listed(filter_recent(quant_fut.result(), HOURS_BACK),
+                                               filter_recent(ai_fut.result(), HOURS_BACK))
+        quant_new = quant_new[:MAX_QUANT]
+        ai_new    = ai_new[:MAX_AI]
+        print(f"         -> {len(quant_new)} quant, {len(ai_new)} AI")
+
+        # 2. Fetch full text for both groups at once, then Gemini — skipping papers analyzed
+        #    on earlier runs. Both pools draw on _arxiv_html, so arxiv.org sees the same pace
+        quant_fut = ex.submit(prepare_papers, quant_new, "quant", "quant", analyzed)
+        ai_papers,    ai_reused,    ai_full    = prepare_papers(ai_new, "ai", "AI", analyzed)
+        quant_papers, quant_reused, quant_full = quant_fut.result()
+        quant_result, ai_result = analyze_trader_papers(quant_papers, ai_papers)
+        longevity_new, bio_papers, bio_reused, longevity_result = longevity_fut.result()
 
     if not quant_new and not ai_new and not longevity_new:
         print("No recent papers. Generating empty page.")
-        html = generate_html({"papers": []}, {"papers": []}, {"papers": []}, 0, 0, 0, 0, 0)
-        os.makedirs("docs", exist_ok=True)
-        open(OUTPUT_FILE, "w", encoding="utf-8").write(html)
+        save_page({"papers": []}, {"papers": []}, {"papers": []}, 0, 0, 0, 0, 0)
         return
 
-    # 2. Fetch full text + Gemini analysis per category
-    quant_result, quant_full = fetch_and_analyze(quant_new,    "quant", "quant")
-    ai_result,    ai_full    = fetch_and_analyze(ai_new,       "ai",    "AI")
-    longevity_result         = analyze_longevity(longevity_new)
+    quant_result     = merge_analyzed(quant_result, quant_papers, quant_reused, analyzed)
+    ai_result        = merge_analyzed(ai_result, ai_papers, ai_reused, analyzed)
+    longevity_result = merge_analyzed(longevity_result, bio_papers, bio_reused, analyzed)
+    _cache_save(ANALYZED_FILE, analyzed)
 
     total_full  = quant_full + ai_full
     total_count = len(quant_new) + len(ai_new)
 
-    # 3. Generate HTML
-    html = generate_html(
+    # 3. Write HTML
+    save_page(
         quant_result, ai_result, longevity_result,
         len(quant_new), len(ai_new), len(longevity_new),
         total_full, total_count,
     )
-    os.makedirs("docs", exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as fh:
-        fh.write(html)
     print(f"[{ts()}] Done -> {OUTPUT_FILE}")
 
 